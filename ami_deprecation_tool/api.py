@@ -1,14 +1,21 @@
 import datetime as dt
+import heapq
 import logging
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+import math
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import partial
 from itertools import cycle
-from typing import Callable
+from typing import Any, Callable, cast
 
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
 from mypy_boto3_ec2.client import EC2Client
 from mypy_boto3_ec2.type_defs import ImageTypeDef
 
@@ -30,12 +37,47 @@ class Action(str, Enum):
     DEPRECATE = "deprecate"
 
 
+class OutcomeStatus(str, Enum):
+    SUCCESS = "success"
+    SKIPPED = "skipped"
+    RETRYABLE_ERROR = "retryable_error"
+    FATAL_ERROR = "fatal_error"
+
+
+# error codes indicating the request may succeed if sent again
+RETRYABLE_ERROR_CODES = {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "Unavailable",
+}
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 2
+
+
+@dataclass
+class OperationOutcome:
+    image_name: str
+    region: str
+    operation: str
+    resource_id: str
+    status: OutcomeStatus
+    duration: float
+    error: str = ""
+
+
 @dataclass
 class ActionImages:
     delete: list[str] = field(default_factory=list)
     deprecate: list[str] = field(default_factory=list)
     keep: list[str] = field(default_factory=list)
     skip: list[str] = field(default_factory=list)
+    deferred: list[str] = field(default_factory=list)
+    # outcomes carry timings, so they are excluded from equality
+    outcomes: list[OperationOutcome] = field(default_factory=list, compare=False)
 
 
 @dataclass
@@ -44,7 +86,193 @@ class Actions:
     policy: dict[str, str | int]
 
 
-def deprecate(config: ConfigModel, dry_run: bool) -> dict[str, Actions]:
+@dataclass
+class Inventory:
+    regions: list[str] = field(default_factory=list)
+    # keyed on image name pattern, then on image name
+    images: dict[str, dict[str, list[RegionImageContainer]]] = field(default_factory=dict)
+
+
+def _natural_serial_key(name: str) -> tuple[tuple[int, int | str], ...]:
+    """
+    Sort key comparing runs of digits numerically, so that e.g. 1.10 sorts after 1.9
+
+    :param name: an image name
+    :type name: str
+    :return: a sort key for the image name
+    :rtype: tuple[tuple[int, int | str], ...]
+    """
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in re.findall(r"\d+|\D+", name))
+
+
+SERIAL_KEYS: dict[str, Callable[[str], Any]] = {
+    "alphanumeric": str,
+    "natural": _natural_serial_key,
+}
+
+
+class Deadline:
+    """
+    A time budget for a run. A Deadline created without a budget never expires.
+    """
+
+    def __init__(self, budget: dt.timedelta | None = None):
+        self._end = None if budget is None else time.monotonic() + budget.total_seconds()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def remaining(self) -> float:
+        if self._end is None:
+            return math.inf
+        return max(0.0, self._end - time.monotonic())
+
+
+NO_DEADLINE = Deadline()
+
+
+MUTATING_OPERATIONS = ("enable_image_deprecation", "deregister_image", "delete_snapshot")
+
+
+class LocalDryRunClient:
+    """
+    Wraps an EC2Client so that mutating operations are never sent to AWS. Read operations are passed
+    through unchanged. If probe_permissions is set, each mutating operation is sent with DryRun=True
+    until AWS answers it without a retryable error, to verify the caller is permitted to perform it in
+    this region.
+    """
+
+    def __init__(self, client: EC2Client, region: str, probe_permissions: bool):
+        self._client = client
+        self._region = region
+        self._probe_permissions = probe_permissions
+        self._probed: set[str] = set()
+        self._probing: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name in MUTATING_OPERATIONS:
+            return partial(self._skip_operation, name)
+        return getattr(self._client, name)
+
+    def _skip_operation(self, name: str, **kwargs: Any) -> None:
+        with self._lock:
+            probe = self._probe_permissions and name not in self._probed and name not in self._probing
+            if probe:
+                self._probing.add(name)
+
+        if not probe:
+            logger.debug(f"LOCAL_DRY_RUN: skipping {name} in region ({self._region}) with arguments: {kwargs}")
+            return
+
+        # the operation only counts as probed once AWS has answered, so a throttled probe is sent again on retry
+        answered = False
+        try:
+            logger.info(f"Probing permissions for {name} in region ({self._region})")
+            getattr(self._client, name)(**{**kwargs, "DryRun": True})
+            answered = True
+        except ClientError as e:
+            answered = e.response["Error"]["Code"] not in RETRYABLE_ERROR_CODES
+            raise
+        finally:
+            with self._lock:
+                self._probing.discard(name)
+                if answered:
+                    self._probed.add(name)
+
+
+HEDGED_OPERATIONS = ("describe_images", "describe_regions")
+# latencies observed in a region before its own percentile is used to decide when to hedge
+HEDGE_MIN_SAMPLES = 5
+HEDGE_MAX_SAMPLES = 100
+HEDGE_MAX_WORKERS = 64
+
+
+class ReadHedger:
+    """
+    Sends a duplicate of a slow idempotent read request and uses whichever response arrives first.
+    A request is hedged once it has taken longer than the configured percentile of previous latencies
+    in its region, as long as fewer than the budgeted fraction of requests have been hedged.
+    """
+
+    def __init__(self, options: ConfigOptionsModel):
+        self._percentile = options.hedge_percentile
+        self._budget = options.hedge_budget
+        self._initial_delay = options.hedge_initial_delay
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=HEDGE_MAX_SAMPLES))
+        self._requests = 0
+        self._hedged = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS)
+
+    def call(self, region: str, operation: Callable, **kwargs: Any) -> Any:
+        with self._lock:
+            self._requests += 1
+        start = time.monotonic()
+        primary = self._executor.submit(operation, **kwargs)
+        primary.add_done_callback(lambda _: self._record(region, time.monotonic() - start))
+
+        done, _ = wait([primary], timeout=self._hedge_delay(region))
+        if done or not self._take_budget():
+            return primary.result()
+
+        logger.info(f"Hedging slow read request in region ({region}) after {time.monotonic() - start:.2f}s")
+        hedge = self._executor.submit(operation, **kwargs)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        # the first response was an error, fall back to the other request if it is still outstanding
+        return (pending or done).pop().result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _hedge_delay(self, region: str) -> float:
+        with self._lock:
+            samples = sorted(self._latencies[region])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return self._initial_delay
+        return samples[int(self._percentile * (len(samples) - 1))]
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._hedged >= self._budget * self._requests:
+                return False
+            self._hedged += 1
+            return True
+
+    def _record(self, region: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[region].append(latency)
+
+
+class HedgedReadClient:
+    """
+    Wraps an EC2Client so that idempotent read operations are sent through a ReadHedger. All other
+    operations are passed through unchanged. Only the clients used to list regions and images are
+    wrapped, so the latencies a ReadHedger observes are those of listing requests.
+    """
+
+    def __init__(self, client: EC2Client, region: str, hedger: ReadHedger):
+        self._client = client
+        self._region = region
+        self._hedger = hedger
+
+    def __getattr__(self, name: str) -> Any:
+        if name in HEDGED_OPERATIONS:
+            return partial(self._hedger.call, self._region, getattr(self._client, name))
+        return getattr(self._client, name)
+
+
+def deprecate(
+    config: ConfigModel,
+    dry_run: bool,
+    local_dry_run: bool = False,
+    probe_permissions: bool = False,
+    deadline: dt.timedelta | None = None,
+    inventory: Inventory | None = None,
+) -> dict[str, Actions]:
     """
     Identify images to be deprecated and apply specified policy
 
@@ -52,72 +280,156 @@ def deprecate(config: ConfigModel, dry_run: bool) -> dict[str, Actions]:
     :type config: ConfigModel
     :param dry_run: disables actioning the images if True
     :type dry_run: bool
+    :param local_dry_run: plan actions without sending any mutating requests to AWS. Implies dry_run
+    :type local_dry_run: bool
+    :param probe_permissions: with local_dry_run, send a single DryRun request per region and operation
+    :type probe_permissions: bool
+    :param deadline: time budget for the run. Once spent, no new deprecations or deletions are started
+    :type deadline: dt.timedelta | None
+    :param inventory: if provided, every listed image is recorded in it for later simulation
+    :type inventory: Inventory | None
     :return: dictionary mapping action name (e.g. keep, deprecate, delete) to a list of images
     :rtype: dict[str, Actions]
     """
-    client = boto3.client("ec2")
-    regions = _get_all_regions(client)
-    region_clients = {}
-
-    if dry_run:
-        logger.info("DRY_RUN is enabled, all actions will be skipped")
-
-    for region in regions:
-        region_clients[region] = boto3.client("ec2", region_name=region)
-
-    actions_dict = {}
-    for image_name, policy in config.images.items():
-        # key image_name, and value is a list of tuples containing (region, ami)
-        region_images = defaultdict(list)
-
-        with ThreadPoolExecutor(max_workers=max(1, int(len(regions) / 2))) as executor:
-            images = executor.map(_get_images, region_clients.values(), cycle([image_name]), cycle([config.options]))
-            images_by_region = dict(zip(region_clients.keys(), list(images)))
-
-        for region, images_in_region in images_by_region.items():
-            for image in images_in_region:
-                region_images[image["Name"]].append(
-                    RegionImageContainer(
-                        region,
-                        image["ImageId"],
-                        dt.datetime.fromisoformat(str(image["CreationDate"])),
-                        _get_snapshot_ids(image),
-                    )
+    run_deadline = Deadline(deadline)
+    # a single timestamp is used for every expiry check so all policies share the same cutoff
+    now = dt.datetime.now()
+    hedger = ReadHedger(config.options) if config.options.hedge_reads else None
+    try:
+        client = boto3.client("ec2")
+        if hedger is not None:
+            client = cast(EC2Client, HedgedReadClient(client, "default", hedger))
+        regions = _get_all_regions(client)
+        region_clients = {}
+        listing_clients = {}
+
+        if local_dry_run:
+            dry_run = True
+            logger.info("LOCAL_DRY_RUN is enabled, no mutating requests will be sent")
+        elif dry_run:
+            logger.info("DRY_RUN is enabled, all actions will be skipped")
+
+        for region in regions:
+            region_client = boto3.client("ec2", region_name=region)
+            # only listing requests are hedged, lookups made while actioning images are sent directly
+            listing_clients[region] = region_client
+            if hedger is not None:
+                listing_clients[region] = cast(EC2Client, HedgedReadClient(region_client, region, hedger))
+            if local_dry_run:
+                region_client = cast(EC2Client, LocalDryRunClient(region_client, region, probe_permissions))
+            region_clients[region] = region_client
+
+        if inventory is not None:
+            inventory.regions = list(regions)
+
+        plans: dict[str, tuple[ActionImages, dict[str, list[RegionImageContainer]]]] = {}
+        for image_name, policy in config.images.items():
+            # key image_name, and value is a list of tuples containing (region, ami)
+            region_images = defaultdict(list)
+
+            with ThreadPoolExecutor(max_workers=max(1, int(len(regions) / 2))) as executor:
+                images = executor.map(
+                    _get_images, listing_clients.values(), cycle([image_name]), cycle([config.options])
                 )
+                images_by_region = dict(zip(listing_clients.keys(), list(images)))
+
+            for region, images_in_region in images_by_region.items():
+                for image in images_in_region:
+                    region_images[image["Name"]].append(
+                        RegionImageContainer(
+                            region,
+                            image["ImageId"],
+                            dt.datetime.fromisoformat(str(image["CreationDate"])),
+                            _get_snapshot_ids(image),
+                        )
+                    )
+
+            if inventory is not None:
+                inventory.images[image_name] = dict(region_images)
 
-        sorted_image_regions = dict(sorted(region_images.items()))
+            plans[image_name] = _plan_deprecation_policy(region_images, region_clients, policy, now)
 
-        image_actions = _apply_deprecation_policy(sorted_image_regions, region_clients, policy, dry_run)
+        # action the patterns with the most out of policy images first, so the most valuable work is done
+        # if the deadline is reached
+        prioritised = sorted(plans, key=lambda name: _priority(plans[name][1], config.images[name]))
+        for image_name in prioritised:
+            image_actions, out_of_policy = plans[image_name]
+            _apply_deprecation_policy(
+                image_actions, out_of_policy, region_clients, config.images[image_name], dry_run, run_deadline
+            )
 
-        actions_dict[image_name] = Actions(policy=dict(policy), images=image_actions)
+        # retryable failures from every image set are retried together once all of them have been actioned
+        _retry_failed_operations(plans, region_clients, dry_run, run_deadline)
+    finally:
+        if hedger is not None:
+            hedger.shutdown()
 
-    return actions_dict
+    return {
+        image_name: Actions(policy=dict(policy), images=plans[image_name][0])
+        for image_name, policy in config.images.items()
+    }
 
 
-def _image_is_expired(images: list[RegionImageContainer], policy: ConfigPolicyModel) -> bool:
+def _image_priority(
+    image_name: str, images: list[RegionImageContainer], policy: ConfigPolicyModel
+) -> tuple[int, dt.datetime, Any]:
     """
-    Identify if image is past expiration based on policy
+    Sort key ordering images by the number of snapshots deleting them frees, then by age, then by serial
 
+    :param image_name: the name of the image
+    :type image_name: str
     :param images: a list of tuples pairing the region name with the ami id in that region
     :type images: list[RegionImageContainer]
     :param policy: The deprecation policy for the given image set
     :type policy: ConfigPolicyModel
-    :return: boolean representing if the image is past the policy expiration date
-    :rtype: bool
+    :return: a sort key, lower values are actioned first
+    :rtype: tuple[int, dt.datetime, Any]
     """
+    snapshots = sum(len(image.snapshots) for image in images) if policy.action == Action.DELETE else 0
+    return (-snapshots, min(image.creation_date for image in images), SERIAL_KEYS[policy.serial_ordering](image_name))
 
-    # check if the image is has existed longer than keep_days days
-    cutoff = dt.datetime.now() - dt.timedelta(days=policy.keep_days)
 
+def _priority(
+    region_images: dict[str, list[RegionImageContainer]], policy: ConfigPolicyModel
+) -> tuple[int, int, dt.datetime]:
+    """
+    Sort key ordering image patterns by the number of out of policy images, then by the number of
+    snapshots freed and the age of the oldest image
+
+    :param region_images: a dictionary keyed on out of policy image names mapped to a list of tuples
+    pairing the region name with the ami id in that region
+    :type region_images: dict[str, list[RegionImageContainer]]
+    :param policy: The deprecation policy for the given image set
+    :type policy: ConfigPolicyModel
+    :return: a sort key, lower values are actioned first
+    :rtype: tuple[int, int, dt.datetime]
+    """
+    if not region_images:
+        return (0, 0, dt.datetime.max)
+    keys = [_image_priority(name, images, policy) for name, images in region_images.items()]
+    return (-len(region_images), sum(key[0] for key in keys), min(key[1] for key in keys))
+
+
+def _image_is_expired(images: list[RegionImageContainer], cutoff: dt.datetime) -> bool:
+    """
+    Identify if image is past expiration based on policy
+
+    :param images: a list of tuples pairing the region name with the ami id in that region
+    :type images: list[RegionImageContainer]
+    :param cutoff: images created before this time are past the policy expiration date
+    :type cutoff: dt.datetime
+    :return: boolean representing if the image is past the policy expiration date
+    :rtype: bool
+    """
     return images[0].creation_date < cutoff
 
 
-def _apply_deprecation_policy(
+def _plan_deprecation_policy(
     region_images: dict[str, list[RegionImageContainer]],
     region_clients: dict[str, EC2Client],
     policy: ConfigPolicyModel,
-    dry_run: bool,
-) -> ActionImages:
+    now: dt.datetime | None = None,
+) -> tuple[ActionImages, dict[str, list[RegionImageContainer]]]:
     """
     Identify images to be deprecated based on policy and upload completeness (i.e. an
     image is present in all regions)
@@ -129,37 +441,94 @@ def _apply_deprecation_policy(
     :type region_clients: dict[str, EC2Client]
     :param policy: The deprecation policy for the given image set
     :type policy: ConfigPolicyModel
-    :param dry_run: disables actioning the images if True
-    :type dry_run: bool
-    :return: dictionary mapping action name (e.g. keep, deprecate, delete) to a list of images
-    :rtype: ActionImages
+    :param now: the time expiry is measured from, defaults to the current time
+    :type now: dt.datetime | None
+    :return: the images to keep and skip, and the out of policy images keyed on image name
+    :rtype: tuple[ActionImages, dict[str, list[RegionImageContainer]]]
     """
-    completed_serials: int = 0
-
-    image_actions = ActionImages()
+    cutoff = (now or dt.datetime.now()) - dt.timedelta(days=policy.keep_days)
+    serial_key = SERIAL_KEYS[policy.serial_ordering]
+    keys = {image: serial_key(image) for image in region_images}
+
+    # check if image exists in all regions (i.e. is a completed upload)
+    complete = {image for image, images in region_images.items() if len(images) == len(region_clients)}
+
+    # walking serials newest first, the first expired image seen while exactly `keep` complete serials
+    # have been passed is out of policy along with every older image. That window lies between the
+    # `keep`th newest complete serial (exclusive) and the next complete serial (inclusive)
+    newest_complete = heapq.nlargest(policy.keep + 1, complete, key=keys.__getitem__)
+    newest_expired = None
+    if len(newest_complete) >= policy.keep:
+        upper = keys[newest_complete[policy.keep - 1]] if policy.keep else None
+        lower = keys[newest_complete[policy.keep]] if len(newest_complete) > policy.keep else None
+        newest_expired = max(
+            (
+                keys[image]
+                for image, images in region_images.items()
+                if (upper is None or keys[image] < upper)
+                and (lower is None or keys[image] >= lower)
+                and _image_is_expired(images, cutoff)
+            ),
+            default=None,
+        )
 
-    for image in sorted(list(region_images.keys()), reverse=True):
-        if completed_serials == policy.keep and _image_is_expired(region_images[image], policy):
-            break
+    in_policy = [image for image in region_images if newest_expired is None or keys[image] > newest_expired]
+    out_of_policy = [image for image in region_images if newest_expired is not None and keys[image] <= newest_expired]
 
-        # check if image exists in all regions (i.e. is a completed upload)
-        is_complete = len(region_images[image]) == len(region_clients.keys())
-        if is_complete:
-            completed_serials += 1
+    image_actions = ActionImages()
+    for image in sorted(in_policy, key=keys.__getitem__, reverse=True):
+        if image in complete:
             image_actions.keep.append(image)
         else:
             image_actions.skip.append(image)
-        region_images.pop(image)
+
+    # out of policy images are ordered once, by priority, when they are actioned
+    return image_actions, {image: region_images[image] for image in out_of_policy}
+
+
+def _apply_deprecation_policy(
+    image_actions: ActionImages,
+    region_images: dict[str, list[RegionImageContainer]],
+    region_clients: dict[str, EC2Client],
+    policy: ConfigPolicyModel,
+    dry_run: bool,
+    deadline: Deadline = NO_DEADLINE,
+) -> None:
+    """
+    Apply the policy action to out of policy images, highest priority first. Actioned images are
+    reported in the order they were started, and images not started before the deadline are recorded
+    as deferred.
+
+    :param image_actions: the planned actions for the image set, updated in place
+    :type image_actions: ActionImages
+    :param region_images: a dictionary keyed on out of policy image names mapped to a list of tuples
+    pairing the region name with the ami id in that region
+    :type region_images: dict[str, list[RegionImageContainer]]
+    :param region_clients: a dicitonary mapping region names to an EC2Client for that region
+    :type region_clients: dict[str, EC2Client]
+    :param policy: The deprecation policy for the given image set
+    :type policy: ConfigPolicyModel
+    :param dry_run: disables actioning the images if True
+    :type dry_run: bool
+    :param deadline: the time budget for the run
+    :type deadline: Deadline
+    """
+    prioritised = dict(sorted(region_images.items(), key=lambda item: _image_priority(item[0], item[1], policy)))
 
     match policy.action:
         case Action.DEPRECATE:
-            image_actions.deprecate = list(region_images.keys())
-            _deprecate_images(dry_run, region_clients, region_images)
+            image_actions.outcomes = _deprecate_images(dry_run, region_clients, prioritised, deadline)
         case Action.DELETE:
-            image_actions.delete = list(region_images.keys())
-            _delete_images(dry_run, region_clients, region_images)
+            image_actions.outcomes = _delete_images(dry_run, region_clients, prioritised, deadline)
 
-    return image_actions
+    started = {outcome.image_name for outcome in image_actions.outcomes}
+    actioned = [image for image in prioritised if image in started]
+    image_actions.deferred = [image for image in prioritised if image not in started]
+    match policy.action:
+        case Action.DEPRECATE:
+            image_actions.deprecate = actioned
+        case Action.DELETE:
+            image_actions.delete = actioned
 
 
 def _get_all_regions(client: EC2Client) -> list[str]:
@@ -185,19 +554,20 @@ def _get_images(client: EC2Client, name: str, options: ConfigOptionsModel) -> li
     :type name: str
     :param options: Tool configuration options
     :type options: ConfigOptionsModel
-    :return: the images in reverse order sorted by Name
+    :return: the images, in no particular order
     :rtype: list[ImageTypeDef]
     """
 
+    now = dt.datetime.now()
+
     def _is_deprecated(image: ImageTypeDef) -> bool:
         deprecation_time = image.get("DeprecationTime", "")
         if not deprecation_time:
             return False
-        if dt.datetime.fromisoformat(deprecation_time.rstrip("Z")) > dt.datetime.now():
+        if dt.datetime.fromisoformat(deprecation_time.rstrip("Z")) > now:
             return False
         return True
 
-    # assumes images are consistently sortable
     images = client.describe_images(
         Owners=["self"],
         IncludeDisabled=options.include_disabled,
@@ -208,7 +578,7 @@ def _get_images(client: EC2Client, name: str, options: ConfigOptionsModel) -> li
     # describe images does nothing
     if not options.include_deprecated:
         images = [image for image in images if not _is_deprecated(image)]
-    return sorted(images, key=lambda x: x["Name"], reverse=True)
+    return images
 
 
 def _get_snapshot_ids(image: ImageTypeDef) -> list[str]:
@@ -232,14 +602,118 @@ def _concurrent_map_operation(
     region_clients: dict[str, EC2Client],
     image_containers: list[RegionImageContainer],
     dry_run: bool,
-):
+) -> list[OperationOutcome]:
     with ThreadPoolExecutor(max_workers=max(1, int(len(region_clients) / 2))) as executor:
-        executor.map(action_func, cycle([image_name]), cycle([region_clients]), image_containers, cycle([dry_run]))
+        results = executor.map(
+            action_func, cycle([image_name]), cycle([region_clients]), image_containers, cycle([dry_run])
+        )
+        return [outcome for outcomes in results for outcome in outcomes]
 
 
-def _deprecate_images(
-    dry_run: bool, region_clients: dict[str, EC2Client], images: dict[str, list[RegionImageContainer]]
+def _retry_failed_operations(
+    plans: dict[str, tuple[ActionImages, dict[str, list[RegionImageContainer]]]],
+    region_clients: dict[str, EC2Client],
+    dry_run: bool,
+    deadline: Deadline = NO_DEADLINE,
 ) -> None:
+    """
+    Re-attempt operations across all image sets that failed with a retryable error, backing off
+    exponentially between passes. The outcomes of each image set are updated in place.
+
+    :param plans: a dictionary keyed on image name pattern mapped to the actions for the image set and
+    its out of policy images
+    :type plans: dict[str, tuple[ActionImages, dict[str, list[RegionImageContainer]]]]
+    :param region_clients: a dicitonary mapping region names to an EC2Client for that region
+    :type region_clients: dict[str, EC2Client]
+    :param dry_run: disables actioning the images if True
+    :type dry_run: bool
+    :param deadline: the time budget for the run, no retry pass is started once it would be exceeded
+    :type deadline: Deadline
+    """
+
+    def _retry(task: tuple[str, OperationOutcome]) -> list[OperationOutcome]:
+        pattern, outcome = task
+        return _retry_operation(outcome, plans[pattern][1], region_clients, dry_run)
+
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        pending = [
+            (pattern, outcome)
+            for pattern, (image_actions, _) in plans.items()
+            for outcome in image_actions.outcomes
+            if outcome.status == OutcomeStatus.RETRYABLE_ERROR
+        ]
+        if not pending:
+            return
+        delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+        if delay >= deadline.remaining():
+            logger.warning(f"Deadline reached, not retrying {len(pending)} failed operations")
+            return
+        logger.info(f"Retrying {len(pending)} failed operations in {delay}s (attempt {attempt}/{RETRY_ATTEMPTS})")
+        time.sleep(delay)
+
+        with ThreadPoolExecutor(max_workers=max(1, int(len(region_clients) / 2))) as executor:
+            retried = list(executor.map(_retry, pending))
+
+        for image_actions, _ in plans.values():
+            image_actions.outcomes = [o for o in image_actions.outcomes if o.status != OutcomeStatus.RETRYABLE_ERROR]
+        for (pattern, _), outcomes in zip(pending, retried):
+            plans[pattern][0].outcomes.extend(outcomes)
+
+    for image_actions, _ in plans.values():
+        for outcome in image_actions.outcomes:
+            if outcome.status == OutcomeStatus.RETRYABLE_ERROR:
+                logger.error(
+                    f"Giving up on {outcome.operation} of ({outcome.image_name}, {outcome.resource_id}) "
+                    f"in region ({outcome.region}) after {RETRY_ATTEMPTS} retries"
+                )
+
+
+def _retry_operation(
+    outcome: OperationOutcome,
+    images: dict[str, list[RegionImageContainer]],
+    region_clients: dict[str, EC2Client],
+    dry_run: bool,
+) -> list[OperationOutcome]:
+    """
+    Re-attempt the operation that produced the given outcome
+
+    :param outcome: the outcome of the failed operation
+    :type outcome: OperationOutcome
+    :param images: a dictionary keyed on image names mapped to a list of tuples pairing the
+    region name with the ami id in that region
+    :type images: dict[str, list[RegionImageContainer]]
+    :param region_clients: a dicitonary mapping region names to an EC2Client for that region
+    :type region_clients: dict[str, EC2Client]
+    :param dry_run: disables actioning the images if True
+    :type dry_run: bool
+    :return: the outcomes of the re-attempted operation
+    :rtype: list[OperationOutcome]
+    """
+    match outcome.operation:
+        case "delete_snapshot":
+            # a failed snapshot deletion is retried on its own, the image has already been deregistered
+            client = region_clients[outcome.region]
+            return [_delete_snapshot(client, outcome.resource_id, dry_run, outcome.image_name, outcome.region)]
+        case "deregister_image":
+            image = _find_container(images, outcome.image_name, outcome.region)
+            return _delete_image(outcome.image_name, region_clients, image, dry_run)
+        case _:
+            image = _find_container(images, outcome.image_name, outcome.region)
+            return _deprecate_image(outcome.image_name, region_clients, image, dry_run)
+
+
+def _find_container(
+    images: dict[str, list[RegionImageContainer]], image_name: str, region: str
+) -> RegionImageContainer:
+    return next(container for container in images[image_name] if container.region == region)
+
+
+def _deprecate_images(
+    dry_run: bool,
+    region_clients: dict[str, EC2Client],
+    images: dict[str, list[RegionImageContainer]],
+    deadline: Deadline = NO_DEADLINE,
+) -> list[OperationOutcome]:
     """
     Mark provided images for deprecation 1 minute in the future. 1 minute is the minimum allowed deprecation time.
 
@@ -250,29 +724,50 @@ def _deprecate_images(
     :param images: a dictionary keyed on image names mapped to a list of tuples pairing the
     region name with the ami id in that region
     :type images: dict[str, list[RegionImageContainer]]
+    :param deadline: the time budget for the run, no new image is started once it is spent
+    :type deadline: Deadline
+    :return: the outcome of every operation attempted, retryable failures are retried by _retry_failed_operations
+    :rtype: list[OperationOutcome]
     """
-    for image_name, image_containers in images.items():
+    outcomes = []
+    for started, (image_name, image_containers) in enumerate(images.items()):
+        if deadline.expired():
+            logger.warning(f"Deadline reached, deferring deprecation of {len(images) - started} images")
+            break
         # Set DeprecationTime 1 minute in the future
         logger.info(f"Found image for deprecation ({image_name})")
-        _concurrent_map_operation(_deprecate_image, image_name, region_clients, image_containers, dry_run)
+        outcomes += _concurrent_map_operation(_deprecate_image, image_name, region_clients, image_containers, dry_run)
+
+    return outcomes
 
 
-def _deprecate_image(image_name: str, clients: dict[str, EC2Client], image: RegionImageContainer, dry_run: bool):
+def _deprecate_image(
+    image_name: str, clients: dict[str, EC2Client], image: RegionImageContainer, dry_run: bool
+) -> list[OperationOutcome]:
     logger.info(f"Deprecating image ({image_name} , {image.image_id}) in region ({image.region})")
     client: EC2Client = clients[image.region]
-    _perform_operation(
-        client.enable_image_deprecation,
-        {
-            "ImageId": image.image_id,
-            "DeprecateAt": str(dt.datetime.now() + dt.timedelta(minutes=1)),
-            "DryRun": dry_run,
-        },
-    )
+    args: dict[str, str | bool] = {
+        "ImageId": image.image_id,
+        "DeprecateAt": str(dt.datetime.now() + dt.timedelta(minutes=1)),
+        "DryRun": dry_run,
+    }
+    return [
+        _run_operation(
+            image_name,
+            image.region,
+            "enable_image_deprecation",
+            image.image_id,
+            partial(_perform_operation, client.enable_image_deprecation, args),
+        )
+    ]
 
 
 def _delete_images(
-    dry_run: bool, region_clients: dict[str, EC2Client], images: dict[str, list[RegionImageContainer]]
-) -> None:
+    dry_run: bool,
+    region_clients: dict[str, EC2Client],
+    images: dict[str, list[RegionImageContainer]],
+    deadline: Deadline = NO_DEADLINE,
+) -> list[OperationOutcome]:
     """
     Delete/Deregister provided images
 
@@ -283,47 +778,126 @@ def _delete_images(
     :param images: a dictionary keyed on image names mapped to a list of tuples pairing the
     region name with the ami id in that region
     :type images: dict[str, list[RegionImageContainer]]
+    :param deadline: the time budget for the run, no new image is started once it is spent
+    :type deadline: Deadline
+    :return: the outcome of every operation attempted, retryable failures are retried by _retry_failed_operations
+    :rtype: list[OperationOutcome]
     """
-    for image_name, image_containers in images.items():
+    outcomes = []
+    for started, (image_name, image_containers) in enumerate(images.items()):
+        if deadline.expired():
+            logger.warning(f"Deadline reached, deferring deletion of {len(images) - started} images")
+            break
         logger.info(f"Found image for deletion ({image_name})")
-        _concurrent_map_operation(_delete_image, image_name, region_clients, image_containers, dry_run)
+        outcomes += _concurrent_map_operation(_delete_image, image_name, region_clients, image_containers, dry_run)
 
+    return outcomes
 
-def _delete_image(image_name: str, clients: dict[str, EC2Client], image: RegionImageContainer, dry_run: bool):
+
+def _delete_image(
+    image_name: str, clients: dict[str, EC2Client], image: RegionImageContainer, dry_run: bool
+) -> list[OperationOutcome]:
     logger.info(f"Deleting image ({image_name}, {image.image_id}) in region ({image.region})")
     client = clients[image.region]
-    _perform_operation(client.deregister_image, {"ImageId": image.image_id, "DryRun": dry_run})
-    for snapshot_id in image.snapshots:
-        _delete_snapshot(client, snapshot_id, dry_run)
-
-
-def _delete_snapshot(client: EC2Client, snapshot_id: str, dry_run: bool):
-    result = client.describe_images(
-        Filters=[
-            {
-                "Name": "block-device-mapping.snapshot-id",
-                "Values": [snapshot_id],
-            }
-        ]
+    outcome = _run_operation(
+        image_name,
+        image.region,
+        "deregister_image",
+        image.image_id,
+        partial(_perform_operation, client.deregister_image, {"ImageId": image.image_id, "DryRun": dry_run}),
     )
-    images_using_snapshot = [i["ImageId"] for i in result.get("Images", [])]
+    # snapshots cannot be deleted while the image using them is still registered
+    if outcome.status not in (OutcomeStatus.SUCCESS, OutcomeStatus.SKIPPED):
+        return [outcome]
+    return [outcome] + [
+        _delete_snapshot(client, snapshot_id, dry_run, image_name, image.region) for snapshot_id in image.snapshots
+    ]
 
-    if images_using_snapshot:
-        dry_run_addendum = (
-            " dry-run will always indicate a skipped snapshot since the image wasn't deleted." if dry_run else ""
-        )
-        joined_images = "\n - ".join(i for i in images_using_snapshot)
-        logger.info(
-            f"{len(images_using_snapshot)} images are using snapshot ({snapshot_id}), skipping delete."
-            f"{dry_run_addendum}"
-            f"\n - {joined_images}"
+
+def _delete_snapshot(
+    client: EC2Client, snapshot_id: str, dry_run: bool, image_name: str, region: str
+) -> OperationOutcome:
+    def _delete() -> OutcomeStatus:
+        # the image is still registered in a local dry-run, so looking up its users would always find it.
+        # The snapshot is reported as planned, and the local client probes delete_snapshot once per region
+        if isinstance(client, LocalDryRunClient):
+            logger.info(f"Deleting associated snapshot if unused: {snapshot_id}")
+            return _perform_operation(client.delete_snapshot, {"SnapshotId": snapshot_id, "DryRun": dry_run})
+
+        result = client.describe_images(
+            Filters=[
+                {
+                    "Name": "block-device-mapping.snapshot-id",
+                    "Values": [snapshot_id],
+                }
+            ]
         )
-    else:
+        images_using_snapshot = [i["ImageId"] for i in result.get("Images", [])]
+
+        if images_using_snapshot:
+            dry_run_addendum = (
+                " dry-run will always indicate a skipped snapshot since the image wasn't deleted." if dry_run else ""
+            )
+            joined_images = "\n - ".join(i for i in images_using_snapshot)
+            logger.info(
+                f"{len(images_using_snapshot)} images are using snapshot ({snapshot_id}), skipping delete."
+                f"{dry_run_addendum}"
+                f"\n - {joined_images}"
+            )
+            return OutcomeStatus.SKIPPED
+
         logger.info(f"Deleting associated snapshot: {snapshot_id}")
-        _perform_operation(client.delete_snapshot, {"SnapshotId": snapshot_id, "DryRun": dry_run})
+        return _perform_operation(client.delete_snapshot, {"SnapshotId": snapshot_id, "DryRun": dry_run})
+
+    return _run_operation(image_name, region, "delete_snapshot", snapshot_id, _delete)
+
+
+def _run_operation(
+    image_name: str, region: str, operation: str, resource_id: str, func: Callable[[], OutcomeStatus]
+) -> OperationOutcome:
+    """
+    Run a single operation, timing it and classifying any AWS error as retryable or fatal
+
+    :param image_name: the name of the image the operation belongs to
+    :type image_name: str
+    :param region: the region the operation is performed in
+    :type region: str
+    :param operation: the name of the EC2 operation
+    :type operation: str
+    :param resource_id: the id of the image or snapshot being operated on
+    :type resource_id: str
+    :param func: a function performing the operation and returning its status
+    :type func: Callable[[], OutcomeStatus]
+    :return: the outcome of the operation
+    :rtype: OperationOutcome
+    """
+    start = time.monotonic()
+    error = ""
+    try:
+        status = func()
+    except ClientError as e:
+        code = e.response["Error"]["Code"]
+        status = OutcomeStatus.RETRYABLE_ERROR if code in RETRYABLE_ERROR_CODES else OutcomeStatus.FATAL_ERROR
+        error = str(e)
+    except (BotoConnectionError, HTTPClientError) as e:
+        status = OutcomeStatus.RETRYABLE_ERROR
+        error = str(e)
+
+    if error:
+        logger.warning(f"{operation} of ({image_name}, {resource_id}) in region ({region}) failed: {error}")
+
+    return OperationOutcome(
+        image_name=image_name,
+        region=region,
+        operation=operation,
+        resource_id=resource_id,
+        status=status,
+        duration=time.monotonic() - start,
+        error=error,
+    )
 
 
-def _perform_operation(operation: Callable, args: dict[str, str | bool]):
+def _perform_operation(operation: Callable, args: dict[str, str | bool]) -> OutcomeStatus:
     """
     A thin wrapper around a callable to handle common exceptions (specifically dry-run)
 
@@ -331,6 +905,8 @@ def _perform_operation(operation: Callable, args: dict[str, str | bool]):
     :type operation: Callable
     :param args: the arguments to pass to operation
     :type args: dict[str, str | bool]
+    :return: SKIPPED if the operation was a dry-run, otherwise SUCCESS
+    :rtype: OutcomeStatus
     """
     logger.debug(f"Performing operation {operation} with the following arguments: {args}")
     try:
@@ -338,6 +914,7 @@ def _perform_operation(operation: Callable, args: dict[str, str | bool]):
     except ClientError as e:
         match e.response["Error"]["Code"]:
             case "DryRunOperation":
-                pass
+                return OutcomeStatus.SKIPPED
             case _:
                 raise e
+    return OutcomeStatus.SKIPPED if args.get("DryRun") else OutcomeStatus.SUCCESS
@@ -1,3 +1,5 @@
+import dataclasses
+import datetime as dt
 import logging
 import sys
 
@@ -6,7 +8,7 @@ import yaml
 from botocore.exceptions import ClientError
 from pydantic import ValidationError
 
-from . import api
+from . import api, simulate
 from .configmodels import ConfigModel
 
 
@@ -32,18 +34,112 @@ from .configmodels import ConfigModel
     default=True,
     help="Prevent deprecation, only log intended actions (default=True)",
 )
-def deprecate(policy_path, log_level, output_actions, dry_run):
+@click.option(
+    "--local-dry-run",
+    "local_dry_run",
+    is_flag=True,
+    default=False,
+    help="Compute and log intended actions without sending any mutating requests to AWS. Implies --dry-run",
+)
+@click.option(
+    "--probe-permissions",
+    "probe_permissions",
+    is_flag=True,
+    default=False,
+    help="Send DryRun requests per region and operation to verify permissions. Requires --local-dry-run",
+)
+@click.option(
+    "--deadline",
+    "deadline",
+    type=click.IntRange(min=1),
+    help=(
+        "Time budget in minutes. The highest priority images are actioned first and no new actions are"
+        " started once the budget is spent"
+    ),
+)
+@click.option(
+    "--save-inventory",
+    "save_inventory",
+    type=click.Path(dir_okay=False),
+    help="yaml file to write the listed images to, for use with simulate-amis",
+)
+def deprecate(
+    policy_path, log_level, output_actions, dry_run, local_dry_run, probe_permissions, deadline, save_inventory
+):
+    if probe_permissions and not local_dry_run:
+        raise click.UsageError("--probe-permissions requires --local-dry-run")
     _setup_logging(log_level)
     config = _load_policy(policy_path)
+    inventory = api.Inventory() if save_inventory else None
     try:
-        actions = api.deprecate(config, dry_run)
+        actions = api.deprecate(
+            config,
+            dry_run,
+            local_dry_run,
+            probe_permissions,
+            dt.timedelta(minutes=deadline) if deadline else None,
+            inventory,
+        )
         if output_actions:
             with open(output_actions, "w") as fh:
                 yaml.dump(actions, fh)
+        if inventory is not None:
+            with open(save_inventory, "w") as fh:
+                yaml.safe_dump(simulate.inventory_to_dict(inventory), fh)
     except ClientError as e:
         sys.exit(e)
 
 
+@click.command()
+@click.option(
+    "-p",
+    "--policy",
+    "policy_path",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="path to yaml config file.",
+)
+@click.option(
+    "-i",
+    "--inventory",
+    "inventory_path",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="path to an inventory captured with 'deprecate-amis --save-inventory'.",
+)
+@click.option(
+    "-k",
+    "--keep",
+    "keeps",
+    type=click.IntRange(min=0),
+    multiple=True,
+    help="keep value to evaluate, may be repeated (default: the policy value)",
+)
+@click.option(
+    "-d",
+    "--keep-days",
+    "keep_days",
+    type=click.IntRange(min=0),
+    multiple=True,
+    help="keep_days value to evaluate, may be repeated (default: the policy value)",
+)
+@click.option("-o", "--output", "output_path", type=str, help="yaml file to write simulation results to")
+def simulate_policy(policy_path, inventory_path, keeps, keep_days, output_path):
+    config = _load_policy(policy_path)
+    with open(inventory_path) as fh:
+        inventory = simulate.inventory_from_dict(yaml.safe_load(fh))
+
+    results = simulate.simulate(inventory, config, list(keeps), list(keep_days))
+
+    if output_path:
+        with open(output_path, "w") as fh:
+            yaml.safe_dump([dataclasses.asdict(result) for result in results], fh, sort_keys=False)
+    else:
+        click.echo("pattern\taction\tkeep\tkeep_days\timages\tsnapshots")
+        for r in results:
+            click.echo(f"{r.pattern}\t{r.action}\t{r.keep}\t{r.keep_days}\t{r.images}\t{r.snapshots}")
+
+
 def _load_policy(policy_path: str) -> ConfigModel:
     with open(policy_path) as fh:
         config = yaml.safe_load(fh)
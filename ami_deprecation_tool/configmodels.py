@@ -13,6 +13,12 @@ class ConfigPolicyModel(BaseModel):
     )
     keep: int = Field(description="The number of AMIs to exempt from the policy")
     keep_days: int = Field(description="How many days to exempt AMIs from the policy", default=0)
+    serial_ordering: Literal["alphanumeric", "natural"] = Field(
+        description=(
+            "How serials are ordered. 'natural' compares runs of digits numerically (e.g. 1.10 is newer than 1.9)"
+        ),
+        default="alphanumeric",
+    )
 
 
 class ConfigOptionsModel(BaseModel):
@@ -30,6 +36,27 @@ class ConfigOptionsModel(BaseModel):
     )
     include_deprecated: bool = Field(default=False, description=("Include deprecated images in policy application"))
     include_disabled: bool = Field(default=False, description=("Include disabled images in policy application"))
+    hedge_reads: bool = Field(
+        default=False,
+        description=(
+            "Send a duplicate of slow describe_images and describe_regions requests and use whichever"
+            " response arrives first"
+        ),
+    )
+    hedge_percentile: float = Field(
+        default=0.95,
+        gt=0,
+        le=1,
+        description="Latency percentile of previous requests in a region after which a read request is hedged",
+    )
+    hedge_budget: float = Field(
+        default=0.1, ge=0, le=1, description="The maximum fraction of read requests which may be hedged"
+    )
+    hedge_initial_delay: float = Field(
+        default=2.0,
+        gt=0,
+        description="Seconds after which a read request is hedged, until enough latencies have been observed",
+    )
 
 
 class ConfigModel(BaseModel):
@@ -0,0 +1,151 @@
+import dataclasses
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from .api import SERIAL_KEYS, Inventory, RegionImageContainer
+from .configmodels import ConfigModel, ConfigPolicyModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationResult:
+    pattern: str
+    action: str
+    keep: int
+    keep_days: int
+    images: int
+    snapshots: int
+
+
+@dataclass
+class _PatternArrays:
+    # all lists are ordered newest serial first
+    created: list[dt.datetime]
+    # index of each complete serial
+    complete_positions: list[int]
+    # number of snapshots belonging to the image at each index and every older image
+    suffix_snapshots: list[int]
+
+
+def inventory_to_dict(inventory: Inventory) -> dict[str, Any]:
+    """
+    Convert an inventory into plain types suitable for yaml.safe_dump
+
+    :param inventory: a captured inventory
+    :type inventory: Inventory
+    :return: the inventory as a dictionary
+    :rtype: dict[str, Any]
+    """
+    return dataclasses.asdict(inventory)
+
+
+def inventory_from_dict(data: dict[str, Any]) -> Inventory:
+    """
+    Rebuild an inventory from the output of inventory_to_dict
+
+    :param data: the inventory as a dictionary
+    :type data: dict[str, Any]
+    :return: the inventory
+    :rtype: Inventory
+    """
+    return Inventory(
+        regions=data["regions"],
+        images={
+            pattern: {name: [RegionImageContainer(**image) for image in images] for name, images in names.items()}
+            for pattern, names in data["images"].items()
+        },
+    )
+
+
+def simulate(
+    inventory: Inventory,
+    config: ConfigModel,
+    keeps: list[int],
+    keep_days: list[int],
+    now: dt.datetime | None = None,
+) -> list[SimulationResult]:
+    """
+    Evaluate every combination of keep and keep_days against a captured inventory. Each pattern is
+    ordered once, after which each variant is evaluated in constant time. Patterns missing from the
+    inventory are skipped.
+
+    :param inventory: a captured inventory
+    :type inventory: Inventory
+    :param config: the deprecation policy config, used for the action and serial ordering of each pattern
+    :type config: ConfigModel
+    :param keeps: keep values to evaluate, the configured value is used if empty
+    :type keeps: list[int]
+    :param keep_days: keep_days values to evaluate, the configured value is used if empty
+    :type keep_days: list[int]
+    :param now: the time expiry is measured from, defaults to the current time
+    :type now: dt.datetime | None
+    :return: the number of images and snapshots out of policy for each pattern and variant
+    :rtype: list[SimulationResult]
+    """
+    now = now or dt.datetime.now()
+    results = []
+
+    for pattern, policy in config.images.items():
+        if pattern not in inventory.images:
+            logger.warning(f"{pattern} was not captured in the inventory, skipping")
+            continue
+        arrays = _precompute(inventory.images[pattern], len(inventory.regions), policy)
+        for days in keep_days or [policy.keep_days]:
+            first_expired = _first_expired_from(arrays.created, now - dt.timedelta(days=days))
+            for keep in keeps or [policy.keep]:
+                cutoff = _cutoff_index(arrays, keep, first_expired)
+                results.append(
+                    SimulationResult(
+                        pattern=pattern,
+                        action=policy.action,
+                        keep=keep,
+                        keep_days=days,
+                        images=len(arrays.created) - cutoff,
+                        snapshots=arrays.suffix_snapshots[cutoff],
+                    )
+                )
+
+    return results
+
+
+def _precompute(
+    region_images: dict[str, list[RegionImageContainer]], region_count: int, policy: ConfigPolicyModel
+) -> _PatternArrays:
+    serial_key = SERIAL_KEYS[policy.serial_ordering]
+    names = sorted(region_images, key=serial_key, reverse=True)
+
+    suffix_snapshots = [0] * (len(names) + 1)
+    for index in range(len(names) - 1, -1, -1):
+        snapshots = sum(len(image.snapshots) for image in region_images[names[index]])
+        suffix_snapshots[index] = suffix_snapshots[index + 1] + snapshots
+
+    return _PatternArrays(
+        created=[region_images[name][0].creation_date for name in names],
+        complete_positions=[index for index, name in enumerate(names) if len(region_images[name]) == region_count],
+        suffix_snapshots=suffix_snapshots,
+    )
+
+
+def _first_expired_from(created: list[dt.datetime], cutoff: dt.datetime) -> list[int]:
+    """
+    For each index, the index of the first expired image at or after it, or len(created) if there is none
+    """
+    first_expired = [len(created)] * (len(created) + 1)
+    for index in range(len(created) - 1, -1, -1):
+        first_expired[index] = index if created[index] < cutoff else first_expired[index + 1]
+    return first_expired
+
+
+def _cutoff_index(arrays: _PatternArrays, keep: int, first_expired: list[int]) -> int:
+    """
+    The index of the newest out of policy image, matching the selection in api._plan_deprecation_policy
+    """
+    if keep > len(arrays.complete_positions):
+        return len(arrays.created)
+    start = arrays.complete_positions[keep - 1] + 1 if keep else 0
+    # only images up to and including the next complete serial can start the out of policy images
+    end = arrays.complete_positions[keep] if keep < len(arrays.complete_positions) else len(arrays.created) - 1
+    return first_expired[start] if first_expired[start] <= end else len(arrays.created)
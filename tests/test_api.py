@@ -1,8 +1,11 @@
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, call, patch
 
 import pytest
+from botocore.exceptions import ClientError
 
 from ami_deprecation_tool import api, configmodels
 
@@ -73,10 +76,11 @@ def test_get_images(mock_boto):
     mock_options = MagicMock()
     result = api._get_images(mock_client, "image-1-$serial", mock_options)
 
+    # ordering is left to policy application, so images are returned as listed
     assert result == [
-        mk_image("126", "image-1-126", ONE_MONTH_AGO),
         mk_image("125", "image-1-125", ONE_MONTH_AGO),
         mk_image("124", "image-1-124", ONE_MONTH_AGO),
+        mk_image("126", "image-1-126", ONE_MONTH_AGO),
         mk_image("123", "image-1-123", ONE_MONTH_AGO),
     ]
 
@@ -150,7 +154,8 @@ def test_apply_policy(mock_boto, mock_deprecate_images, mock_delete_images):
     region_clients = {"region-1": mock_client, "region-2": mock_client}
 
     policy = configmodels.ConfigPolicyModel(**{"keep": 3, "action": "delete"})
-    api._apply_deprecation_policy(region_images.copy(), region_clients, policy, True)
+    image_actions, out_of_policy = api._plan_deprecation_policy(region_images.copy(), region_clients, policy)
+    api._apply_deprecation_policy(image_actions, out_of_policy, region_clients, policy, True)
     mock_delete_images.assert_called_once_with(
         True,
         region_clients,
@@ -161,10 +166,12 @@ def test_apply_policy(mock_boto, mock_deprecate_images, mock_delete_images):
             ],
             "image-20250201": [mk_reg_img("region-2", "ami-113", ONE_MONTH_AGO)],
         },
+        api.NO_DEADLINE,
     )
 
     policy = configmodels.ConfigPolicyModel(**{"keep": 1, "action": "deprecate"})
-    api._apply_deprecation_policy(region_images.copy(), region_clients, policy, True)
+    image_actions, out_of_policy = api._plan_deprecation_policy(region_images.copy(), region_clients, policy)
+    api._apply_deprecation_policy(image_actions, out_of_policy, region_clients, policy, True)
     mock_deprecate_images.assert_called_once_with(
         True,
         region_clients,
@@ -183,6 +190,7 @@ def test_apply_policy(mock_boto, mock_deprecate_images, mock_delete_images):
                 mk_reg_img("region-2", "ami-312", ONE_MONTH_AGO),
             ],
         },
+        api.NO_DEADLINE,
     )
 
 
@@ -191,7 +199,7 @@ def test_apply_policy(mock_boto, mock_deprecate_images, mock_delete_images):
 def test_snapshot_deleted_if_not_used(mock_boto, mock_perform_operation):
     mock_client = mock_boto.client.return_value
     mock_client.describe_images.return_value = {"Images": []}
-    api._delete_snapshot(mock_client, "snapshot_id", True)
+    api._delete_snapshot(mock_client, "snapshot_id", True, "image-1", "region-1")
     mock_perform_operation.assert_called_once()
 
 
@@ -200,8 +208,9 @@ def test_snapshot_deleted_if_not_used(mock_boto, mock_perform_operation):
 def test_snapshot_skipped_if_in_use(mock_boto, mock_perform_operation):
     mock_client = mock_boto.client.return_value
     mock_client.describe_images.return_value = {"Images": [{"ImageId": "ami-123"}]}
-    api._delete_snapshot(mock_client, "snapshot_id", True)
+    outcome = api._delete_snapshot(mock_client, "snapshot_id", True, "image-1", "region-1")
     mock_perform_operation.assert_not_called()
+    assert outcome.status == api.OutcomeStatus.SKIPPED
 
 
 def expect(delete, deprecate, keep, skip, policy):
@@ -213,7 +222,7 @@ def expect(delete, deprecate, keep, skip, policy):
                 keep=keep,
                 skip=skip,
             ),
-            policy=policy,
+            policy=dict(configmodels.ConfigPolicyModel(**policy)),
         )
     }
 
@@ -305,3 +314,441 @@ def test_deprecation_scenarios(mock_boto, _snap, name: str, scenario: Scenario):
         scenario.skip,
         scenario.policy,
     )
+
+
+@pytest.mark.parametrize("probe_permissions", [True, False])
+def test_local_dry_run_client(probe_permissions):
+    mock_client = MagicMock()
+    client = api.LocalDryRunClient(mock_client, "region-1", probe_permissions)
+
+    client.deregister_image(ImageId="ami-111", DryRun=True)
+    client.deregister_image(ImageId="ami-112", DryRun=True)
+    client.delete_snapshot(SnapshotId="snap-111", DryRun=True)
+    client.describe_images(Owners=["self"])
+
+    mock_client.describe_images.assert_called_once_with(Owners=["self"])
+    if probe_permissions:
+        mock_client.deregister_image.assert_called_once_with(ImageId="ami-111", DryRun=True)
+        mock_client.delete_snapshot.assert_called_once_with(SnapshotId="snap-111", DryRun=True)
+    else:
+        mock_client.deregister_image.assert_not_called()
+        mock_client.delete_snapshot.assert_not_called()
+
+
+@patch("ami_deprecation_tool.api._get_snapshot_ids", return_value=[])
+@patch("ami_deprecation_tool.api.boto3")
+def test_local_dry_run_skips_mutating_calls(mock_boto, _snap):
+    scenario = SCENARIOS["action_output"]
+    base, r1, r2 = MagicMock(), MagicMock(), MagicMock()
+    base.describe_regions.return_value = {"Regions": [{"RegionName": "region1"}, {"RegionName": "region2"}]}
+    r1.describe_images.return_value = scenario.region1
+    r2.describe_images.return_value = scenario.region2
+    mock_boto.client.side_effect = [base, r1, r2]
+
+    cfg = configmodels.ConfigModel(images={"image-20250101": scenario.policy}, options={})
+    actions = api.deprecate(cfg, False, local_dry_run=True)
+
+    assert actions == expect(
+        scenario.delete,
+        scenario.deprecate,
+        scenario.keep,
+        scenario.skip,
+        scenario.policy,
+    )
+    r1.enable_image_deprecation.assert_not_called()
+    r2.enable_image_deprecation.assert_not_called()
+
+
+@pytest.mark.parametrize("probe_permissions", [True, False])
+@patch("ami_deprecation_tool.api._get_snapshot_ids", return_value=["snap-1", "snap-2"])
+@patch("ami_deprecation_tool.api.boto3")
+def test_local_dry_run_delete_skips_snapshot_lookup(mock_boto, _snap, probe_permissions):
+    base, r1, r2 = MagicMock(), MagicMock(), MagicMock()
+    base.describe_regions.return_value = {"Regions": [{"RegionName": "region1"}, {"RegionName": "region2"}]}
+    r1.describe_images.return_value = make_region_images(image_count_expired=0, image_count_unexpired=4)
+    r2.describe_images.return_value = make_region_images(image_count_expired=0, image_count_unexpired=4)
+    mock_boto.client.side_effect = [base, r1, r2]
+
+    cfg = configmodels.ConfigModel(images={"image-20250101": {"action": "delete", "keep": 1}}, options={})
+    actions = api.deprecate(cfg, False, local_dry_run=True, probe_permissions=probe_permissions)
+
+    assert actions["image-20250101"].images.delete == ["Image-20250101", "Image-20250102", "Image-20250103"]
+    for client in (r1, r2):
+        # only the listing request is sent, snapshot usage is not looked up
+        client.describe_images.assert_called_once()
+        assert client.deregister_image.call_count == int(probe_permissions)
+        assert client.delete_snapshot.call_count == int(probe_permissions)
+
+
+def mk_client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "operation")
+
+
+@patch("ami_deprecation_tool.api.time.sleep")
+def test_deprecate_images_retries_retryable_errors(mock_sleep):
+    mock_client = MagicMock()
+    mock_client.enable_image_deprecation.side_effect = [mk_client_error("RequestLimitExceeded"), None]
+    region_clients = {"region-1": mock_client}
+    images = {"image-20250101": [mk_reg_img("region-1", "ami-111", ONE_MONTH_AGO)]}
+
+    image_actions = api.ActionImages(outcomes=api._deprecate_images(False, region_clients, images))
+    api._retry_failed_operations({"image-$serial": (image_actions, images)}, region_clients, False)
+    outcomes = image_actions.outcomes
+
+    assert mock_client.enable_image_deprecation.call_count == 2
+    mock_sleep.assert_called_once_with(api.RETRY_BASE_DELAY)
+    assert [(o.resource_id, o.operation, o.status) for o in outcomes] == [
+        ("ami-111", "enable_image_deprecation", api.OutcomeStatus.SUCCESS)
+    ]
+
+
+@patch("ami_deprecation_tool.api.time.sleep")
+def test_local_dry_run_retries_throttled_probe(mock_sleep):
+    mock_client = MagicMock()
+    mock_client.enable_image_deprecation.side_effect = [
+        mk_client_error("RequestLimitExceeded"),
+        mk_client_error("DryRunOperation"),
+    ]
+    region_clients = {"region-1": api.LocalDryRunClient(mock_client, "region-1", True)}
+    images = {"image-20250101": [mk_reg_img("region-1", "ami-111", ONE_MONTH_AGO)]}
+
+    image_actions = api.ActionImages(outcomes=api._deprecate_images(True, region_clients, images))
+    api._retry_failed_operations({"image-$serial": (image_actions, images)}, region_clients, True)
+
+    assert mock_client.enable_image_deprecation.call_count == 2
+    assert [o.status for o in image_actions.outcomes] == [api.OutcomeStatus.SKIPPED]
+
+
+@patch("ami_deprecation_tool.api.time.sleep")
+def test_delete_images_records_fatal_errors(mock_sleep):
+    mock_client = MagicMock()
+    mock_client.deregister_image.side_effect = mk_client_error("UnauthorizedOperation")
+    region_clients = {"region-1": mock_client}
+    images = {
+        "image-20250101": [
+            api.RegionImageContainer("region-1", "ami-111", ONE_MONTH_AGO, ["snap-111"]),
+        ]
+    }
+
+    outcomes = api._delete_images(False, region_clients, images)
+
+    mock_sleep.assert_not_called()
+    mock_client.delete_snapshot.assert_not_called()
+    assert [(o.resource_id, o.status) for o in outcomes] == [("ami-111", api.OutcomeStatus.FATAL_ERROR)]
+
+
+@patch("ami_deprecation_tool.api.time.sleep")
+def test_delete_images_retries_only_failed_snapshot(mock_sleep):
+    mock_client = MagicMock()
+    mock_client.describe_images.return_value = {"Images": []}
+    mock_client.delete_snapshot.side_effect = [mk_client_error("Throttling"), None, None]
+    region_clients = {"region-1": mock_client}
+    images = {
+        "image-20250101": [
+            api.RegionImageContainer("region-1", "ami-111", ONE_MONTH_AGO, ["snap-111", "snap-112"]),
+        ]
+    }
+
+    image_actions = api.ActionImages(outcomes=api._delete_images(False, region_clients, images))
+    api._retry_failed_operations({"image-$serial": (image_actions, images)}, region_clients, False)
+    outcomes = image_actions.outcomes
+
+    mock_client.deregister_image.assert_called_once()
+    assert mock_client.delete_snapshot.call_count == 3
+    assert sorted((o.resource_id, o.status) for o in outcomes) == [
+        ("ami-111", api.OutcomeStatus.SUCCESS),
+        ("snap-111", api.OutcomeStatus.SUCCESS),
+        ("snap-112", api.OutcomeStatus.SUCCESS),
+    ]
+
+
+@patch("ami_deprecation_tool.api.time.sleep")
+def test_retry_failed_operations_single_pass_across_patterns(mock_sleep):
+    mock_client = MagicMock()
+    throttled = {"ami-111": 1, "ami-211": 2}
+
+    def enable_image_deprecation(ImageId, **_):
+        if throttled.get(ImageId):
+            throttled[ImageId] -= 1
+            raise mk_client_error("Throttling")
+
+    mock_client.enable_image_deprecation.side_effect = enable_image_deprecation
+    region_clients = {"region-1": mock_client}
+    plans = {}
+    for pattern, image_id in (("image-a-$serial", "ami-111"), ("image-b-$serial", "ami-211")):
+        images = {pattern: [mk_reg_img("region-1", image_id, ONE_MONTH_AGO)]}
+        plans[pattern] = (api.ActionImages(outcomes=api._deprecate_images(False, region_clients, images)), images)
+
+    api._retry_failed_operations(plans, region_clients, False)
+
+    # both patterns share the backoff of a single retry pass
+    assert mock_sleep.call_args_list == [call(api.RETRY_BASE_DELAY), call(api.RETRY_BASE_DELAY * 2)]
+    assert [[o.status for o in image_actions.outcomes] for image_actions, _ in plans.values()] == [
+        [api.OutcomeStatus.SUCCESS],
+        [api.OutcomeStatus.SUCCESS],
+    ]
+
+
+def test_apply_policy_actions_oldest_first():
+    mock_client = MagicMock()
+    region_clients = {"region-1": mock_client}
+    region_images = {
+        "image-20250101": [mk_reg_img("region-1", "ami-111", ONE_MONTH_AGO)],
+        "image-20250201": [mk_reg_img("region-1", "ami-112", SIX_MONTHS_AGO)],
+    }
+    image_actions = api.ActionImages()
+    policy = configmodels.ConfigPolicyModel(keep=0, action="deprecate")
+
+    api._apply_deprecation_policy(image_actions, region_images, region_clients, policy, False)
+
+    assert [c.kwargs["ImageId"] for c in mock_client.enable_image_deprecation.call_args_list] == ["ami-112", "ami-111"]
+    assert image_actions.deprecate == ["image-20250201", "image-20250101"]
+    assert image_actions.deferred == []
+
+
+def test_apply_policy_ties_ordered_by_serial():
+    mock_client = MagicMock()
+    region_clients = {"region-1": mock_client}
+    region_images = {
+        "image-1.10": [mk_reg_img("region-1", "ami-110", SIX_MONTHS_AGO)],
+        "image-1.2": [mk_reg_img("region-1", "ami-102", SIX_MONTHS_AGO)],
+        "image-1.9": [mk_reg_img("region-1", "ami-109", SIX_MONTHS_AGO)],
+    }
+    image_actions = api.ActionImages()
+    policy = configmodels.ConfigPolicyModel(keep=0, action="deprecate", serial_ordering="natural")
+
+    api._apply_deprecation_policy(image_actions, region_images, region_clients, policy, False)
+
+    assert image_actions.deprecate == ["image-1.2", "image-1.9", "image-1.10"]
+
+
+def test_apply_policy_defers_after_deadline():
+    mock_client = MagicMock()
+    region_clients = {"region-1": mock_client}
+    region_images = {
+        "image-20250101": [api.RegionImageContainer("region-1", "ami-111", SIX_MONTHS_AGO, [])],
+        "image-20250201": [api.RegionImageContainer("region-1", "ami-112", SIX_MONTHS_AGO, ["snap-112"])],
+    }
+    image_actions = api.ActionImages()
+    policy = configmodels.ConfigPolicyModel(keep=0, action="delete")
+    deadline = MagicMock()
+    deadline.expired.side_effect = [False, True]
+
+    api._apply_deprecation_policy(image_actions, region_images, region_clients, policy, False, deadline)
+
+    # the image freeing a snapshot is deleted first
+    mock_client.deregister_image.assert_called_once_with(ImageId="ami-112", DryRun=False)
+    assert image_actions.delete == ["image-20250201"]
+    assert image_actions.deferred == ["image-20250101"]
+
+
+def test_priority():
+    policy = configmodels.ConfigPolicyModel(keep=0, action="deprecate")
+    few = {"image-20250101": [mk_reg_img("region-1", "ami-111", SIX_MONTHS_AGO)]}
+    many = {
+        "image-20250101": [mk_reg_img("region-1", "ami-211", ONE_MONTH_AGO)],
+        "image-20250201": [mk_reg_img("region-1", "ami-212", ONE_MONTH_AGO)],
+    }
+
+    assert sorted([few, many, {}], key=lambda images: api._priority(images, policy)) == [many, few, {}]
+
+
+def test_deadline():
+    assert not api.Deadline().expired()
+    assert api.Deadline(timedelta(minutes=5)).remaining() > 0
+    assert api.Deadline(timedelta(0)).expired()
+
+
+@pytest.mark.parametrize(
+    "serial_ordering, expected_keep, expected_deprecate",
+    [
+        ("alphanumeric", ["image-1.9", "image-1.8"], ["image-1.10"]),
+        ("natural", ["image-1.10", "image-1.9"], ["image-1.8"]),
+    ],
+)
+def test_plan_policy_serial_ordering(serial_ordering, expected_keep, expected_deprecate):
+    region_clients = {"region-1": MagicMock()}
+    region_images = {
+        name: [mk_reg_img("region-1", f"ami-{name}", SIX_MONTHS_AGO)]
+        for name in ["image-1.9", "image-1.10", "image-1.8"]
+    }
+    policy = configmodels.ConfigPolicyModel(keep=2, action="deprecate", serial_ordering=serial_ordering)
+
+    image_actions, out_of_policy = api._plan_deprecation_policy(region_images, region_clients, policy)
+
+    assert image_actions.keep == expected_keep
+    assert list(out_of_policy) == expected_deprecate
+
+
+def test_plan_policy_unexpired_past_keep():
+    region_clients = {"region-1": MagicMock()}
+    region_images = {
+        "image-20250101": [mk_reg_img("region-1", "ami-111", SIX_MONTHS_AGO)],
+        "image-20250201": [mk_reg_img("region-1", "ami-112", SIX_MONTHS_AGO)],
+        "image-20250301": [mk_reg_img("region-1", "ami-113", ONE_MONTH_AGO)],
+        "image-20250401": [mk_reg_img("region-1", "ami-114", ONE_MONTH_AGO)],
+    }
+    policy = configmodels.ConfigPolicyModel(keep=1, action="delete", keep_days=90)
+
+    image_actions, out_of_policy = api._plan_deprecation_policy(region_images, region_clients, policy)
+
+    # an unexpired complete serial past the keep count retains every older image
+    assert image_actions.keep == ["image-20250401", "image-20250301", "image-20250201", "image-20250101"]
+    assert out_of_policy == {}
+
+
+def test_plan_policy_uses_given_time():
+    region_clients = {"region-1": MagicMock()}
+    region_images = {
+        "image-20250101": [mk_reg_img("region-1", "ami-111", ONE_MONTH_AGO)],
+        "image-20250201": [mk_reg_img("region-1", "ami-112", ONE_MONTH_AGO)],
+    }
+    policy = configmodels.ConfigPolicyModel(keep=1, action="delete", keep_days=90)
+
+    _, out_of_policy = api._plan_deprecation_policy(
+        region_images, region_clients, policy, ONE_MONTH_AGO + timedelta(days=91)
+    )
+
+    assert list(out_of_policy) == ["image-20250101"]
+
+
+def mk_hedger(**options):
+    return api.ReadHedger(configmodels.ConfigOptionsModel(hedge_reads=True, **options))
+
+
+def test_read_hedger_uses_first_response():
+    release = threading.Event()
+    calls = []
+
+    def describe_images(**kwargs):
+        calls.append(kwargs)
+        # the first request straggles until the hedged duplicate has answered
+        if len(calls) == 1:
+            release.wait(5)
+            return {"Images": ["slow"]}
+        release.set()
+        return {"Images": ["fast"]}
+
+    hedger = mk_hedger(hedge_initial_delay=0.01, hedge_budget=1)
+    client = api.HedgedReadClient(MagicMock(describe_images=describe_images), "region-1", hedger)
+
+    assert client.describe_images(Owners=["self"]) == {"Images": ["fast"]}
+    assert calls == [{"Owners": ["self"]}, {"Owners": ["self"]}]
+    hedger.shutdown()
+
+
+def test_read_hedger_respects_budget():
+    mock_client = MagicMock()
+    mock_client.describe_images.side_effect = lambda **_: time.sleep(0.05) or {"Images": []}
+
+    hedger = mk_hedger(hedge_initial_delay=0.01, hedge_budget=0)
+    client = api.HedgedReadClient(mock_client, "region-1", hedger)
+
+    assert client.describe_images() == {"Images": []}
+    mock_client.describe_images.assert_called_once()
+    hedger.shutdown()
+
+
+def test_read_hedger_falls_back_on_error():
+    responses = iter([0.05, None])
+
+    def describe_regions():
+        delay = next(responses)
+        if delay is None:
+            raise mk_client_error("InternalError")
+        time.sleep(delay)
+        return {"Regions": []}
+
+    hedger = mk_hedger(hedge_initial_delay=0.01, hedge_budget=1)
+    client = api.HedgedReadClient(MagicMock(describe_regions=describe_regions), "default", hedger)
+
+    assert client.describe_regions() == {"Regions": []}
+    hedger.shutdown()
+
+
+def test_read_hedger_delay_uses_region_percentile():
+    hedger = mk_hedger(hedge_percentile=0.5, hedge_initial_delay=3)
+    for latency in [1, 2, 3, 4, 5]:
+        hedger._record("region-1", latency)
+
+    assert hedger._hedge_delay("region-1") == 3
+    assert hedger._hedge_delay("region-2") == 3
+    hedger._record("region-1", 0.5)
+    assert hedger._hedge_delay("region-1") == 2
+    hedger.shutdown()
+
+
+def test_hedged_read_client_passes_through_writes():
+    mock_client = MagicMock()
+    hedger = MagicMock()
+    client = api.HedgedReadClient(mock_client, "region-1", hedger)
+
+    client.deregister_image(ImageId="ami-111")
+    client.describe_images(Owners=["self"])
+
+    mock_client.deregister_image.assert_called_once_with(ImageId="ami-111")
+    hedger.call.assert_called_once_with("region-1", mock_client.describe_images, Owners=["self"])
+
+
+@pytest.mark.parametrize("failing_request", [0, 1])
+def test_read_hedger_prefers_success_when_both_done(failing_request):
+    responses = [{"Images": ["primary"]}, {"Images": ["hedge"]}]
+    calls = []
+
+    def describe_images():
+        index = len(calls)
+        calls.append(index)
+        if index == failing_request:
+            raise mk_client_error("InternalError")
+        return responses[index]
+
+    def fake_wait(futures, timeout=None, return_when=None):
+        # the first wait times out to force a hedge, the second sees both requests already finished
+        if timeout is not None:
+            return set(), set(futures)
+        done = set(futures)
+        for future in done:
+            future.exception()
+        return done, set()
+
+    hedger = mk_hedger(hedge_budget=1)
+    client = api.HedgedReadClient(MagicMock(describe_images=describe_images), "region-1", hedger)
+
+    with patch("ami_deprecation_tool.api.wait", side_effect=fake_wait):
+        assert client.describe_images() == responses[1 - failing_request]
+    hedger.shutdown()
+
+
+@patch("ami_deprecation_tool.api._get_all_regions", side_effect=mk_client_error("UnauthorizedOperation"))
+@patch("ami_deprecation_tool.api.ReadHedger")
+@patch("ami_deprecation_tool.api.boto3")
+def test_deprecate_shuts_down_hedger_on_error(mock_boto, mock_hedger, _regions):
+    cfg = configmodels.ConfigModel(images={}, options={"hedge_reads": True})
+
+    with pytest.raises(ClientError):
+        api.deprecate(cfg, True)
+
+    mock_hedger.return_value.shutdown.assert_called_once()
+
+
+@patch("ami_deprecation_tool.api._get_snapshot_ids", return_value=["snap-1"])
+@patch("ami_deprecation_tool.api.boto3")
+def test_deprecate_hedges_listing_requests_only(mock_boto, _snap):
+    base, r1, r2 = MagicMock(), MagicMock(), MagicMock()
+    base.describe_regions.return_value = {"Regions": [{"RegionName": "region1"}, {"RegionName": "region2"}]}
+    for client in (r1, r2):
+        client.describe_images.side_effect = [
+            make_region_images(image_count_expired=0, image_count_unexpired=3),
+            *[{"Images": []}] * 2,
+        ]
+    mock_boto.client.side_effect = [base, r1, r2]
+    cfg = configmodels.ConfigModel(
+        images={"image-20250101": {"action": "delete", "keep": 1}}, options={"hedge_reads": True}
+    )
+
+    with patch.object(api.ReadHedger, "call", autospec=True, side_effect=lambda _, __, op, **kw: op(**kw)) as call_:
+        api.deprecate(cfg, True)
+
+    # describe_regions and one listing per region, the per snapshot lookups are not hedged
+    assert call_.call_count == 3
+    assert r1.describe_images.call_count == 3
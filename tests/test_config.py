@@ -1,6 +1,7 @@
 # from unittest.mock import MagicMock, call, patch
 
 import pytest
+from pydantic import ValidationError
 
 from ami_deprecation_tool import configmodels
 
@@ -26,3 +27,17 @@ def test_config_options(
     assert options.executable_users == expected_exec_users
     assert options.include_disabled == expected_disabled
     assert options.include_deprecated == expected_deprecated
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"hedge_percentile": 0},
+        {"hedge_percentile": 1.5},
+        {"hedge_budget": -0.1},
+        {"hedge_initial_delay": 0},
+    ],
+)
+def test_config_options_invalid_hedging(config):
+    with pytest.raises(ValidationError):
+        configmodels.ConfigOptionsModel(**config)
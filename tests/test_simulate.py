@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import yaml
+
+from ami_deprecation_tool import api, configmodels, simulate
+
+NOW = datetime(2025, 6, 1)
+REGIONS = ["region-1", "region-2"]
+
+
+def mk_inventory(seed: int, count: int) -> api.Inventory:
+    rng = random.Random(seed)
+    images = {}
+    for id_ in range(count):
+        # creation dates are not tied to serial order, so unexpired images can follow expired ones
+        created = NOW - timedelta(days=rng.randint(0, 2 * count))
+        regions = REGIONS if rng.random() > 0.2 else REGIONS[:1]
+        images[f"image-2025{id_:04d}"] = [
+            api.RegionImageContainer(region, f"ami-{region}-{id_}", created, [f"snap-{region}-{id_}"])
+            for region in regions
+        ]
+    return api.Inventory(regions=REGIONS, images={"image-$serial": images})
+
+
+def mk_config(**policy) -> configmodels.ConfigModel:
+    return configmodels.ConfigModel(images={"image-$serial": {"action": "delete", **policy}}, options={})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_simulate_matches_policy(seed):
+    inventory = mk_inventory(seed, 40)
+    config = mk_config(keep=1)
+    keeps = [0, 1, 3, 10, 50]
+    keep_days = [0, 5, 20, 100]
+
+    results = simulate.simulate(inventory, config, keeps, keep_days, NOW)
+
+    assert len(results) == len(keeps) * len(keep_days)
+    region_clients = {region: MagicMock() for region in REGIONS}
+    for result in results:
+        policy = configmodels.ConfigPolicyModel(action="delete", keep=result.keep, keep_days=result.keep_days)
+        _, out_of_policy = api._plan_deprecation_policy(inventory.images["image-$serial"], region_clients, policy, NOW)
+        assert result.images == len(out_of_policy)
+        assert result.snapshots == sum(len(i.snapshots) for images in out_of_policy.values() for i in images)
+
+
+def test_simulate_defaults_to_policy_values():
+    inventory = mk_inventory(0, 10)
+    config = mk_config(keep=2, keep_days=3)
+
+    results = simulate.simulate(inventory, config, [], [], NOW)
+
+    assert [(r.pattern, r.action, r.keep, r.keep_days) for r in results] == [("image-$serial", "delete", 2, 3)]
+
+
+def test_simulate_missing_pattern(caplog):
+    config = mk_config(keep=2)
+
+    results = simulate.simulate(api.Inventory(regions=REGIONS), config, [], [], NOW)
+
+    assert results == []
+    assert "image-$serial was not captured in the inventory" in caplog.text
+
+
+def test_inventory_round_trip():
+    inventory = mk_inventory(0, 5)
+
+    dumped = yaml.safe_dump(simulate.inventory_to_dict(inventory))
+
+    assert simulate.inventory_from_dict(yaml.safe_load(dumped)) == inventory